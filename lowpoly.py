@@ -1,15 +1,45 @@
 import bpy
+import bmesh
+import glob
+import logging
+import os
+import queue
 import random
+import shutil
+import subprocess
+import sys
+import tempfile
 import time
 import typer
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import addon_utils
 
 app = typer.Typer()
+log = logging.getLogger(__name__)
+
+_ADDON_ENABLED = False
+
+_REMESHERS = ("quadriflow", "instant")
 
 
 def enable_3d_printing_addon():
-    addon_utils.enable("object_print3d_utils")
+    global _ADDON_ENABLED
+    if _ADDON_ENABLED:
+        return
+    addon_utils.enable("object_print3d_utils", default_set=False, persistent=True)
+    _ADDON_ENABLED = True
+
+
+def deselect_all_objects():
+    for obj in list(bpy.context.view_layer.objects.selected):
+        obj.select_set(False)
+
+
+def select_all_geometry(mesh):
+    for elements in (mesh.vertices, mesh.edges, mesh.polygons):
+        elements.foreach_set("select", np.ones(len(elements), dtype=bool))
 
 
 def set_smooth_shading(obj):
@@ -34,6 +64,14 @@ def import_usdz(file_path):
     bpy.ops.wm.usd_import(filepath=file_path)
 
 
+_IMPORTERS = {
+    ".fbx": import_fbx,
+    ".glb": import_glb,
+    ".obj": import_obj,
+    ".usdz": import_usdz,
+}
+
+
 def create_vertex_color_material(obj):
     mat = bpy.data.materials.new(name="VertexColorMaterial")
     mat.use_nodes = True
@@ -61,6 +99,131 @@ def create_vertex_color_material(obj):
     return mat
 
 
+def has_image_textures(obj):
+    for mat in obj.data.materials:
+        if mat and mat.use_nodes:
+            for node in mat.node_tree.nodes:
+                if node.type == "TEX_IMAGE" and node.image:
+                    return True
+    return False
+
+
+def transfer_vertex_colors(source_obj, target_obj):
+    source_colors = source_obj.data.color_attributes
+    domains = {attribute.domain for attribute in source_colors}
+
+    data_transfer = target_obj.modifiers.new(name="DataTransfer", type="DATA_TRANSFER")
+    data_transfer.object = source_obj
+    if "POINT" in domains:
+        data_transfer.use_vert_data = True
+        data_transfer.data_types_verts = {"COLOR_VERTEX"}
+        data_transfer.vert_mapping = "POLYINTERP_NEAREST"
+    if "CORNER" in domains:
+        data_transfer.use_loop_data = True
+        data_transfer.data_types_loops = {"COLOR_CORNER"}
+        data_transfer.loop_mapping = "POLYINTERP_NEAREST"
+
+    # The remeshed target has no color attributes, create matching ones
+    # before applying the transfer
+    bpy.context.view_layer.objects.active = target_obj
+    bpy.ops.object.datalayout_transfer(modifier=data_transfer.name)
+    bpy.ops.object.modifier_apply(modifier=data_transfer.name)
+
+    # Render with the same attribute the source was using
+    target_colors = target_obj.data.color_attributes
+    if source_colors.active_color:
+        index = target_colors.find(source_colors.active_color.name)
+        if index >= 0:
+            target_colors.active_color_index = index
+            target_colors.render_color_index = index
+
+
+def enable_gpu_devices():
+    prefs = bpy.context.preferences.addons["cycles"].preferences
+
+    # Prefer OptiX for hardware ray tracing, fall back to CUDA. Only backends
+    # compiled into this build can be assigned to compute_device_type.
+    available_types = {item[0] for item in prefs.get_device_types(bpy.context)}
+    for compute_device_type in ("OPTIX", "CUDA"):
+        if compute_device_type not in available_types:
+            continue
+        prefs.compute_device_type = compute_device_type
+        prefs.get_devices()
+        devices = [d for d in prefs.devices if d.type == compute_device_type]
+        if devices:
+            for device in prefs.devices:
+                device.use = device in devices
+            return True
+
+    if "NONE" in available_types:
+        prefs.compute_device_type = "NONE"
+    return False
+
+
+def add_voxel_remesh_modifier(obj, voxel_size):
+    remesh_modifier = obj.modifiers.new(name="Remesh", type="REMESH")
+    remesh_modifier.mode = "VOXEL"
+    remesh_modifier.voxel_size = voxel_size
+    # Collapse uniform regions to feed fewer vertices to the quad remesher
+    remesh_modifier.adaptivity = 0.01
+    # The result is shaded smooth later, skip computing face smoothing here
+    remesh_modifier.use_smooth_shade = False
+    return remesh_modifier
+
+
+def instant_meshes_remesh(obj, target_faces):
+    deselect_all_objects()
+    obj.select_set(True)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = str(Path(tmp_dir) / "input.obj")
+        output_path = str(Path(tmp_dir) / "output.obj")
+
+        bpy.ops.wm.obj_export(
+            filepath=input_path,
+            export_selected_objects=True,
+            export_materials=False,
+            export_uv=False,
+            export_normals=False,
+        )
+        subprocess.run(
+            [
+                "instant-meshes",
+                "-f",
+                str(target_faces),
+                "-S",
+                "2",
+                "-d",
+                "-o",
+                output_path,
+                input_path,
+            ],
+            check=True,
+        )
+        bpy.ops.wm.obj_import(filepath=output_path)
+
+    # Swap the remeshed data into the object. The export baked the world
+    # transform and the Z-up to Y-up conversion into the vertices, and the
+    # import undid the axis conversion only in the new object's matrix, so
+    # apply that matrix and then the inverse of the original world transform
+    remeshed_object = bpy.context.selected_objects[0]
+    remeshed_mesh = remeshed_object.data
+    remeshed_mesh.transform(
+        obj.matrix_world.inverted() @ remeshed_object.matrix_world
+    )
+    for mat in obj.data.materials:
+        remeshed_mesh.materials.append(mat)
+
+    old_mesh = obj.data
+    obj.data = remeshed_mesh
+    bpy.data.objects.remove(remeshed_object)
+    bpy.data.meshes.remove(old_mesh)
+
+    deselect_all_objects()
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+
+
 def find_first_mesh():
     for obj in bpy.context.scene.objects:
         if obj.type == "MESH":
@@ -79,9 +242,19 @@ def execute(
     voxel_remesh_iterations: int = 1,
     cleanup_threshold: float = 0.001,
     keep_vertex_colors: bool = False,
+    remesher: str = "quadriflow",
+    threads: int = 0,
+    verbose: bool = False,
 ):
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO)
     start_time = time.time()
 
+    # Fail before any of the expensive steps run
+    if remesher not in _REMESHERS:
+        raise ValueError(f"Invalid remesher: {remesher}")
+    if remesher == "instant" and shutil.which("instant-meshes") is None:
+        raise FileNotFoundError("instant-meshes executable not found on PATH")
+
     # Delete the default cube
     if "Cube" in bpy.data.objects:
         bpy.data.objects["Cube"].select_set(True)
@@ -93,17 +266,14 @@ def execute(
     script_path = Path(__file__).parent
     file_path = str(script_path / file_path)
 
+    # Remember what was in the scene so only imported data is cleaned up
+    existing_objects = set(bpy.data.objects)
+
     # Import the file
-    if file_path.endswith(".fbx"):
-        import_fbx(file_path)
-    elif file_path.endswith(".glb"):
-        import_glb(file_path)
-    elif file_path.endswith(".obj"):
-        import_obj(file_path)
-    elif file_path.endswith(".usdz"):
-        import_usdz(file_path)
-    else:
+    importer = _IMPORTERS.get(Path(file_path).suffix.lower())
+    if importer is None:
         raise ValueError("Invalid file format")
+    importer(file_path)
 
     # If source_object_name is not specified, find the first mesh in the scene
     if not source_object_name:
@@ -114,108 +284,114 @@ def execute(
     else:
         source_object = bpy.data.objects[source_object_name]
 
-    print(f"Working with mesh: {source_object_name}")
-    print(source_object)
+    log.debug("Working with mesh: %s", source_object_name)
+    log.debug("%s", source_object)
 
     set_smooth_shading(source_object)
 
     # Calculate object height and normalized voxel size
-    bbox = source_object.bound_box
-    object_height = max(vertex[2] for vertex in bbox) - min(
-        vertex[2] for vertex in bbox
-    )
+    bbox_z = np.array(source_object.bound_box, dtype=np.float32)[:, 2]
+    object_height = float(bbox_z.max() - bbox_z.min())
     normalized_voxel_size = object_height * voxel_size_factor
 
-    print(f"Object height: {object_height}")
-    print(f"Normalized voxel size: {normalized_voxel_size}")
+    log.debug("Object height: %s", object_height)
+    log.debug("Normalized voxel size: %s", normalized_voxel_size)
 
     # Duplicate source object
-    bpy.ops.object.select_all(action="DESELECT")
+    deselect_all_objects()
     source_object.select_set(True)
     bpy.context.view_layer.objects.active = source_object
     bpy.ops.object.duplicate()
     target_object = bpy.context.active_object
 
     # Use Volume to Mesh to create a manifold mesh
-    bpy.ops.object.select_all(action="DESELECT")
+    deselect_all_objects()
     target_object.select_set(True)
     bpy.context.view_layer.objects.active = target_object
 
-    # Add a Remesh modifier
-    remesh_modifier = target_object.modifiers.new(name="Remesh", type="REMESH")
-    remesh_modifier.mode = "VOXEL"
-    remesh_modifier.voxel_size = normalized_voxel_size
+    # Let the voxel remesher use all cores, or the budget given by batch
+    bpy.context.scene.render.threads_mode = "FIXED"
+    bpy.context.scene.render.threads = threads or os.cpu_count() or 1
 
-    # Apply the Remesh modifier
+    # Add and apply a Remesh modifier for each iteration
     for _ in range(voxel_remesh_iterations):
+        add_voxel_remesh_modifier(target_object, normalized_voxel_size)
         bpy.ops.object.modifier_apply(modifier="Remesh")
-        if _ < voxel_remesh_iterations - 1:
-            remesh_modifier = target_object.modifiers.new(name="Remesh", type="REMESH")
-            remesh_modifier.mode = "VOXEL"
-            remesh_modifier.voxel_size = normalized_voxel_size
-
-    # Enter edit mode
-    bpy.ops.object.mode_set(mode="EDIT")
 
-    # Select all vertices
-    bpy.ops.mesh.select_all(action="SELECT")
+    # Clean up the remeshed geometry directly in bmesh to avoid mode switches
+    bm = bmesh.new()
+    bm.from_mesh(target_object.data)
 
     # Recalculate normals to ensure consistency
-    bpy.ops.mesh.normals_make_consistent(inside=False)
+    bmesh.ops.recalc_face_normals(bm, faces=bm.faces)
 
     # Merge vertices by distance
-    bpy.ops.mesh.remove_doubles(threshold=cleanup_threshold)
+    bmesh.ops.remove_doubles(bm, verts=bm.verts, dist=cleanup_threshold)
 
     # Optional: Fill holes
-    bpy.ops.mesh.fill_holes(sides=0)
-
-    # Return to object mode
-    bpy.ops.object.mode_set(mode="OBJECT")
+    bmesh.ops.holes_fill(bm, edges=bm.edges, sides=0)
 
     # Check if the mesh is manifold
-    bpy.ops.object.mode_set(mode="EDIT")
-    bpy.ops.mesh.select_all(action="DESELECT")
-    bpy.ops.mesh.select_non_manifold()
+    non_manifold_verts = sum(not v.is_manifold for v in bm.verts)
 
-    non_manifold_verts = sum(v.select for v in target_object.data.vertices)
+    bm.to_mesh(target_object.data)
+    bm.free()
 
     if non_manifold_verts > 0:
-        print(
-            f"Warning: {non_manifold_verts} non-manifold vertices found after cleanup."
+        log.warning(
+            "%d non-manifold vertices found after cleanup.", non_manifold_verts
         )
     else:
-        print("Mesh is manifold.")
-
-    bpy.ops.object.mode_set(mode="OBJECT")
-
-    # Use quad remesher
-    bpy.ops.object.quadriflow_remesh(target_faces=target_faces)
+        log.debug("Mesh is manifold.")
+
+    # Use quad remesher, skipping constraint solves that aren't needed here
+    if remesher == "quadriflow":
+        bpy.ops.object.quadriflow_remesh(
+            target_faces=target_faces,
+            use_mesh_symmetry=False,
+            use_preserve_sharp=False,
+            use_preserve_boundary=False,
+            seed=0,
+        )
+    else:
+        instant_meshes_remesh(target_object, target_faces)
 
     # Check the result
-    quad_count = sum(1 for p in target_object.data.polygons if len(p.vertices) == 4)
-    total_faces = len(target_object.data.polygons)
+    polygons = target_object.data.polygons
+    loop_totals = np.empty(len(polygons), dtype=np.int32)
+    polygons.foreach_get("loop_total", loop_totals)
+    quad_count = int(np.count_nonzero(loop_totals == 4))
+    total_faces = len(polygons)
     quad_percentage = (quad_count / total_faces) * 100 if total_faces > 0 else 0
 
-    print(f"Quad faces: {quad_count}")
-    print(f"Total faces: {total_faces}")
-    print(f"Percentage of quad faces: {quad_percentage:.2f}%")
+    log.debug("Quad faces: %d", quad_count)
+    log.debug("Total faces: %d", total_faces)
+    log.debug("Percentage of quad faces: %.2f%%", quad_percentage)
 
     # Shade the target mesh smooth
     set_smooth_shading(target_object)
 
     # Smart UV Project with specified island margin
     bpy.context.view_layer.objects.active = target_object
+    select_all_geometry(target_object.data)
     bpy.ops.object.editmode_toggle()
-    bpy.ops.mesh.select_all(action="SELECT")
     bpy.ops.uv.smart_project(island_margin=0.02)
     bpy.ops.object.editmode_toggle()
 
-    # Add multiresolution modifier and subdivide
+    # Add multiresolution modifier and subdivide, with viewport evaluation
+    # disabled so each subdivision doesn't re-evaluate the growing mesh
     multires = target_object.modifiers.new(name="Multires", type="MULTIRES")
+    multires.show_viewport = False
 
-    # Subdivide specified number of times
+    # Subdivide specified number of times, linear subdivision is enough since
+    # shrinkwrap projects the levels onto the source surface anyway
     for i in range(multiresolution_levels):
-        bpy.ops.object.multires_subdivide(modifier="Multires", mode="CATMULL_CLARK")
+        bpy.ops.object.multires_subdivide(modifier="Multires", mode="SIMPLE")
+
+    # Keep viewport evaluation at the base level, the subdivided levels are
+    # only needed by shrinkwrap and the normal bake, which bakes against
+    # level 0 since that is the mesh that gets exported
+    multires.levels = 0
 
     # Add shrinkwrap modifier
     shrinkwrap = target_object.modifiers.new(name="Shrinkwrap", type="SHRINKWRAP")
@@ -223,11 +399,24 @@ def execute(
     shrinkwrap.wrap_method = "PROJECT"
     shrinkwrap.project_limit = 0.005
 
+    # Evaluate the finished modifier stack once
+    multires.show_viewport = True
+
     # Check if the object has vertex colors
     has_vertex_colors = len(target_object.data.vertex_colors) > 0
 
+    # A source colored only by vertex colors doesn't need a diffuse bake,
+    # its colors can be transferred straight onto the target
+    use_vertex_color_transfer = (
+        not keep_vertex_colors
+        and len(source_object.data.color_attributes) > 0
+        and not has_image_textures(source_object)
+    )
+
     # Check if the object has any materials, if not, create a new one
-    if len(target_object.data.materials) == 0:
+    if use_vertex_color_transfer:
+        new_mat = create_vertex_color_material(target_object)
+    elif len(target_object.data.materials) == 0:
         if has_vertex_colors and keep_vertex_colors:
             new_mat = create_vertex_color_material(target_object)
         else:
@@ -244,17 +433,29 @@ def execute(
     if not keep_vertex_colors:
         # Create new textures
         number = random.randint(1000, 9999)
-        diffuse_img = bpy.data.images.new(
-            name=f"Diffuse_{number}",
-            width=texture_resolution,
-            height=texture_resolution,
+        if not use_vertex_color_transfer:
+            diffuse_img = bpy.data.images.new(
+                name=f"Diffuse_{number}",
+                width=texture_resolution,
+                height=texture_resolution,
+                alpha=True,
+                float_buffer=False,
+            )
+
+        # Without a diffuse bake a low resolution normal map is enough
+        normal_resolution = (
+            min(texture_resolution, 512)
+            if use_vertex_color_transfer
+            else texture_resolution
         )
         normal_img = bpy.data.images.new(
             name=f"Normals_{number}",
-            width=texture_resolution,
-            height=texture_resolution,
+            width=normal_resolution,
+            height=normal_resolution,
+            float_buffer=True,
+            is_data=True,
         )
-        print(normal_img)
+        log.debug("%s", normal_img)
 
         # Add the image texture nodes, connect them, and set them to the newly created images
         new_mat_node_tree = new_mat.node_tree
@@ -262,65 +463,72 @@ def execute(
         if not bsdf_node:
             bsdf_node = new_mat_node_tree.nodes.new(type="ShaderNodeBsdfPrincipled")
 
-        diffuse_node = new_mat_node_tree.nodes.new(type="ShaderNodeTexImage")
-        diffuse_node.image = diffuse_img
+        if not use_vertex_color_transfer:
+            diffuse_node = new_mat_node_tree.nodes.new(type="ShaderNodeTexImage")
+            diffuse_node.image = diffuse_img
 
         normal_node = new_mat_node_tree.nodes.new(type="ShaderNodeTexImage")
         normal_node.image = normal_img
         normal_map_node = new_mat_node_tree.nodes.new(type="ShaderNodeNormalMap")
 
         # Apply shrinkwrap
-        bpy.ops.object.select_all(action="DESELECT")
+        deselect_all_objects()
         target_object.select_set(True)
         bpy.ops.object.modifier_apply(modifier="Shrinkwrap")
 
         # Set render engine to cycles
-        bpy.context.scene.render.engine = "CYCLES"
-        bpy.context.scene.cycles.device = "GPU"
+        if bpy.context.scene.render.engine != "CYCLES":
+            bpy.context.scene.render.engine = "CYCLES"
+        bpy.context.scene.cycles.device = "GPU" if enable_gpu_devices() else "CPU"
+
+        # Bake each image as a single tile without denoising, which would
+        # corrupt the baked normals
+        bpy.context.scene.cycles.use_auto_tile = True
+        bpy.context.scene.cycles.use_denoising = False
+        bpy.context.scene.cycles.tile_size = texture_resolution
 
         # Select source and target objects for baking
-        bpy.ops.object.select_all(action="DESELECT")
+        deselect_all_objects()
         target_object.select_set(True)
-        target_object.modifiers["Multires"].levels = 1
 
         # Bake normals
         bpy.context.scene.render.use_bake_multires = True
-        print(new_mat_node_tree)
+        log.debug("%s", new_mat_node_tree)
         new_mat_node_tree.nodes.active = normal_node
-        print(new_mat_node_tree.nodes.active.image)
-        print(bpy.context.view_layer.objects.active)
+        log.debug("%s", new_mat_node_tree.nodes.active.image)
+        log.debug("%s", bpy.context.view_layer.objects.active)
         bpy.context.scene.cycles.bake_type = "NORMAL"
-
-        normal_node.image.colorspace_settings.name = "Non-Color"
         bpy.ops.object.bake_image()
-        bpy.ops.image.pack()
 
-        bpy.ops.object.select_all(action="DESELECT")
-        source_object.select_set(True)
-        target_object.select_set(True)
-
-        # Bake diffuse
-        bpy.context.scene.render.bake.use_selected_to_active = True
-        bpy.context.scene.render.bake.use_cage = True
-        bpy.context.scene.render.bake.cage_extrusion = 0.05
-        bpy.context.scene.render.bake.use_pass_direct = False
-        bpy.context.scene.render.bake.use_pass_indirect = False
-        bpy.context.scene.render.bake.use_pass_color = True
-        new_mat_node_tree.nodes.active = diffuse_node
-        print(f"Active image: {new_mat_node_tree.nodes.active.image}")
-        print(f"Active node: {new_mat_node_tree.nodes.active}")
-        bpy.context.scene.cycles.bake_type = "DIFFUSE"
-
-        # Set the render samples to 2
-        bpy.context.scene.cycles.samples = 2
-
-        bpy.ops.object.bake(type="DIFFUSE")
-        bpy.ops.image.pack()
+        if not use_vertex_color_transfer:
+            deselect_all_objects()
+            source_object.select_set(True)
+            target_object.select_set(True)
+
+            # Bake diffuse
+            bpy.context.scene.render.bake.use_selected_to_active = True
+            bpy.context.scene.render.bake.use_cage = True
+            bpy.context.scene.render.bake.cage_extrusion = 0.05
+            bpy.context.scene.render.bake.use_pass_direct = False
+            bpy.context.scene.render.bake.use_pass_indirect = False
+            bpy.context.scene.render.bake.use_pass_color = True
+            new_mat_node_tree.nodes.active = diffuse_node
+            log.debug("Active image: %s", new_mat_node_tree.nodes.active.image)
+            log.debug("Active node: %s", new_mat_node_tree.nodes.active)
+            bpy.context.scene.cycles.bake_type = "DIFFUSE"
+
+            # Set the render samples to 2 and stop early on converged pixels
+            bpy.context.scene.cycles.samples = 2
+            bpy.context.scene.cycles.use_adaptive_sampling = True
+            bpy.context.scene.cycles.adaptive_threshold = 0.1
+
+            bpy.ops.object.bake(type="DIFFUSE")
+
+            new_mat_node_tree.links.new(
+                diffuse_node.outputs["Color"], bsdf_node.inputs["Base Color"]
+            )
 
         # Link nodes
-        new_mat_node_tree.links.new(
-            diffuse_node.outputs["Color"], bsdf_node.inputs["Base Color"]
-        )
         new_mat_node_tree.links.new(
             normal_node.outputs["Color"], normal_map_node.inputs["Color"]
         )
@@ -329,32 +537,142 @@ def execute(
         )
 
     # Remove multires
-    bpy.ops.object.select_all(action="DESELECT")
+    deselect_all_objects()
     target_object.select_set(True)
     bpy.ops.object.modifier_remove(modifier="Multires")
 
+    # Transfer colors onto the final low poly mesh, with Multires gone the
+    # Data Transfer modifier is first in the stack when it is applied
+    if use_vertex_color_transfer:
+        transfer_vertex_colors(source_object, target_object)
+
     # Delete high poly source object
-    bpy.ops.object.select_all(action="DESELECT")
+    deselect_all_objects()
     source_object.select_set(True)
     bpy.ops.object.delete()
 
-    # Export the glb file
+    # Export the glb file, compressed for web delivery
     bpy.ops.export_scene.gltf(
         filepath=Path(file_path).stem + ".glb",
         export_format="GLB",
-        export_image_format="AUTO",
-        export_draco_mesh_compression_enable=False,
+        export_image_format="WEBP",
+        export_image_quality=85,
+        export_draco_mesh_compression_enable=True,
+        export_draco_mesh_compression_level=6,
+        export_draco_position_quantization=14,
+        export_draco_normal_quantization=10,
+        export_draco_texcoord_quantization=12,
     )
 
     end_time = time.time()
     execution_time = end_time - start_time
-    print(f"Total execution time: {execution_time:.2f} seconds")
+    log.info("Total execution time: %.2f seconds", execution_time)
 
-    # Clean up
-    bpy.ops.wm.read_factory_settings()
+    # Clean up the imported and generated data, keeping addons and render
+    # settings loaded for the next call
+    generated_data = [obj for obj in bpy.data.objects if obj not in existing_objects]
+    generated_data.append(new_mat)
+    if not keep_vertex_colors:
+        generated_data.append(normal_img)
+        if not use_vertex_color_transfer:
+            generated_data.append(diffuse_img)
+    bpy.data.batch_remove(generated_data)
+    bpy.ops.outliner.orphans_purge(do_recursive=True)
 
     return {"FINISHED"}
 
 
+def script_command():
+    # Inside the Blender binary sys.executable is its bundled Python, which
+    # can't import bpy, so the script has to be launched through Blender
+    binary_path = bpy.app.binary_path
+    if binary_path and Path(binary_path).resolve() != Path(sys.executable).resolve():
+        return [binary_path, "-b", "--factory-startup", "-P", __file__, "--"]
+    return [sys.executable, __file__]
+
+
+def run_in_subprocess(file_path, execute_args, threads, gpu_slots=None):
+    env = os.environ.copy()
+    gpu = gpu_slots.get() if gpu_slots is not None else None
+    if gpu is not None:
+        env["CUDA_VISIBLE_DEVICES"] = str(gpu)
+
+    command = [
+        *script_command(),
+        "execute",
+        file_path,
+        "--threads",
+        str(threads),
+        *execute_args,
+    ]
+    try:
+        return subprocess.run(command, env=env).returncode
+    finally:
+        if gpu is not None:
+            gpu_slots.put(gpu)
+
+
+@app.command(
+    context_settings={"allow_extra_args": True, "ignore_unknown_options": True}
+)
+def batch(
+    ctx: typer.Context,
+    glob_pattern: str,
+    jobs: int = typer.Option(max(1, (os.cpu_count() or 2) // 2), min=1),
+    gpus: int = typer.Option(0, min=0),
+    verbose: bool = False,
+):
+    # Any other options, e.g. --target-faces, are passed on to execute
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO)
+    execute_args = list(ctx.args)
+    if verbose:
+        execute_args.append("--verbose")
+
+    # Start the largest files first so long conversions don't end up last
+    files = sorted(
+        (str(Path(f).resolve()) for f in glob.glob(glob_pattern)),
+        key=os.path.getsize,
+        reverse=True,
+    )
+    if not files:
+        raise ValueError(f"No files match {glob_pattern}")
+
+    # Every conversion writes <stem>.glb to the working directory
+    stems = [Path(f).stem for f in files]
+    duplicates = sorted({stem for stem in stems if stems.count(stem) > 1})
+    if duplicates:
+        raise ValueError(f"Files share output names: {', '.join(duplicates)}")
+
+    # Split the cores between the jobs instead of each taking all of them
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+
+    # One GPU slot per worker, spread round-robin over the GPUs so that
+    # concurrent jobs land on different cards
+    gpu_slots = None
+    if gpus:
+        gpu_slots = queue.Queue()
+        for slot in range(jobs):
+            gpu_slots.put(slot % gpus)
+
+    # Each file is converted in its own process
+    with ThreadPoolExecutor(jobs) as executor:
+        futures = [
+            executor.submit(run_in_subprocess, f, execute_args, threads, gpu_slots)
+            for f in files
+        ]
+        return_codes = [future.result() for future in futures]
+
+    failed = [f for f, code in zip(files, return_codes) if code != 0]
+    for f in failed:
+        log.error("Failed to convert %s", f)
+    if failed:
+        raise typer.Exit(code=1)
+
+
 if __name__ == "__main__":
-    app()
+    # When run headless as `blender -b --factory-startup -P lowpoly.py -- ...`,
+    # only the arguments after "--" belong to this script
+    if "--" in sys.argv:
+        app(args=sys.argv[sys.argv.index("--") + 1 :])
+    else:
+        app()